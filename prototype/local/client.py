@@ -1,17 +1,137 @@
 """Local browser client that executes actions from the cloud server."""
 
 import asyncio
-import base64
-import sys
-from pathlib import Path
-from typing import Optional
+import hashlib
+import importlib.util
+import io
+import json
+from typing import AsyncIterator, Optional
 
 import httpx
 from browser_use import Browser
+from browser_use.actor import Element
+from PIL import Image
 
-# Add parent directory to path to import shared models
-sys.path.insert(0, str(Path(__file__).parent.parent))
-from shared.models import Action, BrowserState, NavigationRequest, NavigationResponse
+# pybase64 is a SIMD drop-in for the stdlib codec (pip install pybase64)
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+from prototype.shared.models import (
+    UX_FEEDBACK_LIST_ADAPTER,
+    Action,
+    BrowserState,
+    DomElements,
+    NavigationRequest,
+    Viewport,
+)
+
+# HTTP/2 needs the optional `h2` package (pip install 'httpx[http2]') and an https:// server;
+# httpx only negotiates it via TLS ALPN
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Common interactive elements, queried on every state capture
+_INTERACTIVE_SELECTORS = (
+    'a',  # links
+    'button',  # buttons
+    'input',  # inputs
+    'select',  # dropdowns
+    '[onclick]',  # clickable elements
+    '[role="button"]',  # ARIA buttons
+    'textarea',  # text areas
+)
+
+# Truncate in the page so long texts never cross the CDP socket
+_ELEMENT_TEXT_JS = '() => (this.innerText || this.textContent || "").slice(0, 100)'
+
+# Attributes the server-side agents actually look at
+_ATTRIBUTE_WHITELIST = frozenset({
+    'id', 'name', 'type', 'role', 'aria-label', 'placeholder', 'href', 'value', 'class',
+})
+
+# Vision models downscale to roughly this size anyway, so send no more than that
+_SCREENSHOT_MAX_SIZE = (768, 768)
+_SCREENSHOT_WEBP_QUALITY = 75
+
+# Actions that never interact with the page; if the DOM didn't change either,
+# the previous state (and screenshot) is reused as is
+_PASSIVE_ACTIONS = frozenset({"wait", "extract"})
+
+# Counts DOM mutations since the observer was installed; the random token
+# changes whenever a new document is loaded
+_DOM_VERSION_JS = """() => {
+    if (!window.__domVersion) {
+        const version = { token: Math.random().toString(36).slice(2), count: 0 };
+        new MutationObserver(() => { version.count++; })
+            .observe(document, { childList: true, subtree: true, attributes: true, characterData: true });
+        window.__domVersion = version;
+    }
+    return window.__domVersion.token + ':' + window.__domVersion.count;
+}"""
+
+# How long a click gets to visibly take effect (a new document starting to load,
+# or DOM changes from its handlers or XHRs) before it is treated as a no-op
+_CLICK_REACTION_TIMEOUT = 1.5
+
+# Viewport size and scroll offset, in the `[width, height, scroll_x, scroll_y]`
+# wire form of Viewport
+_VIEWPORT_JS = """() => [
+    window.innerWidth, window.innerHeight, Math.round(window.scrollX), Math.round(window.scrollY)
+]"""
+
+# Used when the page can't report its viewport; matches the browser window size
+_DEFAULT_VIEWPORT = Viewport(width=1280, height=720)
+
+# Resolves once the document has finished loading and the DOM has stopped
+# mutating for `quietMs`, or after `maxMs` regardless (busy pages never go quiet)
+_PAGE_READY_JS = """(quietMs, maxMs) => new Promise(resolve => {
+    const settle = () => {
+        let timer = null;
+        const observer = new MutationObserver(() => {
+            clearTimeout(timer);
+            timer = setTimeout(done, quietMs);
+        });
+        const cap = setTimeout(done, maxMs);
+        function done() {
+            observer.disconnect();
+            clearTimeout(timer);
+            clearTimeout(cap);
+            resolve(true);
+        }
+        observer.observe(document, { childList: true, subtree: true, attributes: true });
+        timer = setTimeout(done, quietMs);
+    };
+    if (document.readyState === 'complete') {
+        settle();
+    } else {
+        window.addEventListener('load', settle, { once: true });
+    }
+})"""
+
+
+def _downscale_screenshot(png_b64: str) -> bytes:
+    """Shrink a base64 PNG screenshot to `_SCREENSHOT_MAX_SIZE` and re-encode it as WebP bytes."""
+    image = Image.open(io.BytesIO(base64.b64decode(png_b64, validate=False)))
+    image.thumbnail(_SCREENSHOT_MAX_SIZE, Image.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, 'WEBP', quality=_SCREENSHOT_WEBP_QUALITY)
+    return buffer.getvalue()
+
+
+async def _iter_sse(response: httpx.Response) -> AsyncIterator[tuple[str, str]]:
+    """Yield `(event, data)` pairs from a server-sent events response."""
+    event, data_lines = "message", []
+    async for line in response.aiter_lines():
+        if not line:
+            # A blank line terminates the event
+            if data_lines:
+                yield event, "\n".join(data_lines)
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].lstrip())
 
 
 class LocalBrowserClient:
@@ -21,8 +141,26 @@ class LocalBrowserClient:
         self.server_url = server_url.rstrip('/')
         self.browser: Optional[Browser] = None
         self.headless = headless
+        self._http: Optional[httpx.AsyncClient] = None
         self.step_number = 0
-        self._element_cache = {}  # Cache elements by index for clicking
+        self._element_cache: dict[int, tuple[int, Element]] = {}  # backendNodeId -> (index, element)
+        self._elements_by_index: dict[int, Element] = {}  # Cache elements by index for clicking
+        self._next_index = 0
+        self._dom_version: Optional[str] = None
+        self._last_action_type: Optional[str] = None
+        self._last_state: Optional[BrowserState] = None
+        self._ux_listener: Optional[asyncio.Task] = None
+        
+        # Action type -> handler, see _execute_action
+        self._handlers = {
+            "click": self._do_click,
+            "input": self._do_input,
+            "navigate": self._do_navigate,
+            "scroll": self._do_scroll,
+            "wait": self._do_wait,
+            "extract": self._do_extract,
+            "done": self._do_done,
+        }
         
     async def start(self):
         """Initialize the browser."""
@@ -34,8 +172,25 @@ class LocalBrowserClient:
         await self.browser.start()
         print(f"✓ Browser started (headless={self.headless})")
         
+        # One connection for the whole session; over HTTP/2 the navigate and
+        # report requests are multiplexed on it
+        self._http = httpx.AsyncClient(
+            base_url=self.server_url,
+            timeout=60.0,
+            http2=_HTTP2_AVAILABLE,
+        )
+        
+        # UX feedback arrives on its own stream, independent of the steps
+        self._ux_listener = asyncio.create_task(self._listen_ux())
+        
     async def stop(self):
         """Close the browser."""
+        if self._ux_listener:
+            self._ux_listener.cancel()
+            self._ux_listener = None
+        if self._http:
+            await self._http.aclose()
+            self._http = None
         if self.browser:
             await self.browser.stop()
             print("✓ Browser stopped")
@@ -63,7 +218,7 @@ class LocalBrowserClient:
             print(f"🚀 Navigating to: {url}")
             try:
                 await page.goto(url)
-                await asyncio.sleep(4)  # Wait for page load and JS rendering
+                await self._wait_for_page_ready(page, timeout=10.0)
                 current_url = await page.get_url()
                 title = await page.get_title()
                 
@@ -98,46 +253,52 @@ class LocalBrowserClient:
                 print(f"⚠️  Warning: Page is empty with no interactive elements")
                 print(f"   Current URL: {state.url}")
             
-            # 2. Send to server and get action
+            # 2. Send to server; UX feedback for this page follows later on /ux
             print("🚀 Sending to server...")
+            action: Optional[Action] = None
+            action_task: Optional[asyncio.Task] = None
+            message: Optional[str] = None
             try:
-                response = await self._request_action(task, state)
+                async for event, data in self._stream_action(task, state):
+                    if event == "action":
+                        # 3. Display action and start executing it right away
+                        action = Action.model_validate_json(data)
+                        print(f"\n🎬 Action: {action.type}")
+                        if action.reasoning:
+                            print(f"   Reasoning: {action.reasoning}")
+                        if action.type != "done":
+                            action_task = asyncio.create_task(self._execute_action(page, action))
+                    elif event == "message":
+                        message = data
+                    elif event == "error":
+                        raise RuntimeError(json.loads(data).get("detail", data))
+                if action is None:
+                    raise RuntimeError("Server closed the stream without an action")
             except Exception as e:
+                if action_task:
+                    action_task.cancel()
                 print(f"❌ Error communicating with server: {e}")
                 break
                 
-            # 3. Display UX feedback
-            print(f"\n💡 UX Feedback:")
-            print(f"   Recommendation: {response.ux_feedback.recommendation}")
-            print(f"   Confidence: {response.ux_feedback.confidence:.2f}")
-            if response.ux_feedback.issues:
-                print(f"   Issues: {', '.join(response.ux_feedback.issues)}")
-                
-            # 4. Display action
-            print(f"\n🎬 Action: {response.action.type}")
-            if response.action.reasoning:
-                print(f"   Reasoning: {response.action.reasoning}")
-                
-            # 5. Check if done
-            if response.action.type == "done":
+            # 4. Check if done
+            if action.type == "done":
                 print(f"\n✅ Task completed!")
-                if response.message:
-                    print(f"   {response.message}")
+                if message:
+                    print(f"   {message}")
                 
                 # Generate UX report
                 await self._generate_report(task)
                 break
                 
-            # 6. Execute action
+            # 5. Wait for the action to finish executing
             try:
-                await self._execute_action(page, response.action)
+                await action_task
+                self._last_action_type = action.type
                 print("✓ Action executed")
             except Exception as e:
+                self._last_action_type = None
                 print(f"❌ Error executing action: {e}")
                 continue
-                
-            # Wait between actions
-            await asyncio.sleep(0.5)
         else:
             print(f"\n⚠️  Reached maximum steps ({max_steps})")
             # Generate report even if max steps reached
@@ -147,158 +308,313 @@ class LocalBrowserClient:
         """Request and save UX analysis report from server."""
         try:
             print(f"\n📊 Generating UX Analysis Report...")
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.server_url}/report",
-                    json={"task": task}
-                )
-                response.raise_for_status()
-                
-                result = response.json()
-                if result.get("success"):
-                    print(f"✓ {result.get('message')}")
-                else:
-                    print(f"⚠️  {result.get('message')}")
+            response = await self._http.post(
+                "/report",
+                json={"task": task},
+                timeout=30.0,
+            )
+            response.raise_for_status()
+            
+            result = response.json()
+            if result.get("success"):
+                print(f"✓ {result.get('message')}")
+            else:
+                print(f"⚠️  {result.get('message')}")
         except Exception as e:
             print(f"⚠️  Could not generate report: {e}")
             
     async def _capture_state(self, page) -> BrowserState:
         """Capture current browser state."""
-        # Wait a moment for any dynamic content
-        await asyncio.sleep(1.0)
+        # Get current URL, title, DOM version and viewport directly from the page
+        current_url, title, dom_version, viewport = await asyncio.gather(
+            page.get_url(),
+            page.get_title(),
+            self._get_dom_version(page),
+            self._get_viewport(page),
+        )
         
-        # Get current URL and title directly from the page
-        current_url = await page.get_url()
-        title = await page.get_title()
+        last_state = self._last_state
+        dom_unchanged = (
+            last_state is not None
+            and last_state.url == current_url
+            and dom_version is not None
+            and dom_version == self._dom_version
+        )
         
-        # Clear element cache for new state
-        self._element_cache = {}
+        # Nothing happened to the page (e.g. after wait/extract), reuse the previous state
+        if dom_unchanged and self._last_action_type in _PASSIVE_ACTIONS:
+            return last_state
         
-        # Get interactive elements using CSS selectors (proper Actor API)
-        dom_elements = []
-        try:
-            # Get all common interactive elements
-            selectors = [
-                'a',  # links
-                'button',  # buttons
-                'input',  # inputs
-                'select',  # dropdowns
-                '[onclick]',  # clickable elements
-                '[role="button"]',  # ARIA buttons
-                'textarea',  # text areas
-            ]
-            
-            for selector in selectors:
-                elements = await page.get_elements_by_css_selector(selector)
-                for idx, element in enumerate(elements):
-                    try:
-                        # Get element info
-                        info = await element.get_basic_info()
-                        text = await element.evaluate('() => this.innerText || this.textContent || ""')
-                        
-                        # Create a unique index
-                        element_index = len(dom_elements)
-                        
-                        # Cache the actual Element object for later use
-                        self._element_cache[element_index] = element
-                        
-                        dom_elements.append({
-                            "index": element_index,
-                            "tag": info.get('nodeName', '').lower(),
-                            "text": text[:100] if text else "",
-                            "attributes": info.get('attributes', {}),
-                            "xpath": "",  # Not available via Actor API
-                            "_backend_node_id": info.get('backendNodeId'),  # Store for later use
-                        })
-                    except Exception as e:
-                        # Skip elements that fail to process
-                        continue
-            
-            print(f"   DEBUG - Extracted {len(dom_elements)} interactive elements")
-            
-        except Exception as e:
-            print(f"   DEBUG - Error extracting elements: {e}")
+        if dom_unchanged:
+            # Same DOM, same elements and indices; only the viewport may have moved
+            dom_elements = last_state.dom_elements
+        else:
+            # Indices restart with each new document
+            new_document = self._dom_version is None or dom_version is None or (
+                dom_version.partition(':')[0] != self._dom_version.partition(':')[0]
+            )
+            dom_elements = await self._extract_elements(page, new_document)
+        self._dom_version = dom_version
         
-        # Take screenshot
-        screenshot_b64 = ""
+        # Take screenshot; the page either changed or the last action (e.g. a
+        # scroll) may have moved it, the unchanged case returned above
+        screenshot: Optional[bytes] = None
         try:
-            screenshot_b64 = await page.screenshot(format='png')
+            png_b64 = await page.screenshot(format='png')
+            screenshot = await asyncio.to_thread(_downscale_screenshot, png_b64)
         except Exception as e:
             print(f"   DEBUG - Error taking screenshot: {e}")
         
-        return BrowserState(
+        state = BrowserState(
             url=current_url,
             title=title,
-            html="",  # Not needed when we have DOM elements
-            screenshot=screenshot_b64,
+            screenshot_ref=hashlib.sha1(screenshot).hexdigest() if screenshot else None,
             dom_elements=dom_elements,
-            viewport={"width": 1280, "height": 720},
+            viewport=viewport,
         )
+        state._screenshot = screenshot
+        self._last_state = state
+        return state
+    
+    async def _get_viewport(self, page) -> Viewport:
+        """Get the page's viewport size and current scroll offset."""
+        try:
+            return Viewport.model_validate_json(await page.evaluate(_VIEWPORT_JS))
+        except Exception:
+            return _DEFAULT_VIEWPORT
+    
+    async def _get_dom_version(self, page) -> Optional[str]:
+        """Get the page's `<document token>:<mutation count>` version, or None if unavailable."""
+        try:
+            return await page.evaluate(_DOM_VERSION_JS)
+        except Exception:
+            return None
+    
+    async def _extract_elements(self, page, new_document: bool) -> DomElements:
+        """
+        Extract interactive elements and refresh the element cache.
+        
+        Elements that were already on the page keep their index, so indices
+        the LLM saw on earlier steps stay valid while the document lives.
+        
+        Args:
+            page: Actor page to extract from
+            new_document: Whether the page loaded a new document since the last extraction
+        """
+        previous_cache = {} if new_document else self._element_cache
+        if new_document:
+            self._next_index = 0
+        
+        # Rebuilt from scratch so nodes that left the page drop out
+        self._element_cache = {}
+        self._elements_by_index = {}
+        
+        # Columns of the DomElements built at the end
+        index_col: list[int] = []
+        tag_col: list[str] = []
+        text_col: list[str] = []
+        attributes_col: list[dict[str, str]] = []
         
-    async def _request_action(self, task: str, state: BrowserState) -> NavigationResponse:
-        """Send state to server and get next action."""
+        # Get interactive elements using CSS selectors (proper Actor API)
+        try:
+            # One query for all selectors: each query re-fetches the document,
+            # which invalidates the node ids of any query still in flight. A
+            # selector list also returns each node once, in document order,
+            # even when it matches several selectors (`button`, `[role="button"]`)
+            elements = await page.get_elements_by_css_selector(', '.join(_INTERACTIVE_SELECTORS))
+            
+            # Fetch info and text for all elements at once instead of one by one
+            infos, texts = await asyncio.gather(
+                asyncio.gather(*[element.get_basic_info() for element in elements]),
+                asyncio.gather(
+                    *[element.evaluate(_ELEMENT_TEXT_JS) for element in elements],
+                    return_exceptions=True,
+                ),
+            )
+            
+            for element, info, text in zip(elements, infos, texts):
+                # Skip elements that fail to process
+                if isinstance(text, BaseException):
+                    continue
+                
+                node_id = info.get('backendNodeId')
+                
+                # Reuse the index (and handle) of nodes seen on earlier steps
+                if node_id in previous_cache:
+                    element_index, element = previous_cache[node_id]
+                else:
+                    element_index = self._next_index
+                    self._next_index += 1
+                
+                # Cache the actual Element object for later use
+                self._element_cache[node_id] = (element_index, element)
+                self._elements_by_index[element_index] = element
+                
+                attrs = {
+                    name: value for name, value in info.get('attributes', {}).items()
+                    if name in _ATTRIBUTE_WHITELIST
+                }
+                index_col.append(element_index)
+                tag_col.append(info.get('nodeName', '').lower())
+                text_col.append(text)
+                attributes_col.append(attrs)
+            
+            print(f"   DEBUG - Extracted {len(index_col)} interactive elements")
+            
+        except Exception as e:
+            print(f"   DEBUG - Error extracting elements: {e}")
+        
+        return DomElements(index=index_col, tag=tag_col, text=text_col, attributes=attributes_col)
+        
+    async def _stream_action(self, task: str, state: BrowserState) -> AsyncIterator[tuple[str, str]]:
+        """Send state to server and yield `(event, data)` pairs as they are streamed back."""
         request = NavigationRequest(
             task=task,
             state=state,
             step_number=self.step_number,
         )
         
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                f"{self.server_url}/navigate",
-                json=request.model_dump(),
-            )
+        # The request JSON (encoded straight to bytes by pydantic-core) and the raw
+        # screenshot go as separate multipart parts; no base64 inflation in the JSON
+        files = {"request": (None, request.model_dump_json(), "application/json")}
+        if state._screenshot:
+            files["screenshot"] = ("screenshot.webp", state._screenshot, "image/webp")
+        
+        async with self._http.stream(
+            "POST",
+            "/navigate/stream",
+            files=files,
+        ) as response:
             response.raise_for_status()
-            
-        return NavigationResponse(**response.json())
+            async for event, data in _iter_sse(response):
+                yield event, data
+        
+    async def _listen_ux(self):
+        """Print UX feedback from the server's GET /ux stream for the rest of the session."""
+        try:
+            async with self._http.stream(
+                "GET",
+                "/ux",
+                timeout=httpx.Timeout(60.0, read=None),  # idle between analyses
+            ) as response:
+                response.raise_for_status()
+                async for event, data in _iter_sse(response):
+                    if event != "ux_feedback":
+                        continue
+                    for ux_feedback in UX_FEEDBACK_LIST_ADAPTER.validate_json(data):
+                        print(f"\n💡 UX Feedback ({ux_feedback.url}):")
+                        print(f"   Recommendation: {ux_feedback.recommendation}")
+                        print(f"   Confidence: {ux_feedback.confidence:.2f}")
+                        if ux_feedback.issues:
+                            print(f"   Issues: {', '.join(ux_feedback.issues)}")
+        except Exception as e:
+            print(f"⚠️  UX feedback stream closed: {e}")
         
     async def _execute_action(self, page, action: Action):
         """Execute action on the browser."""
-        if action.type == "click":
-            if action.index is None:
-                raise ValueError("Click action requires index")
-            # Get element from cache
-            if action.index not in self._element_cache:
-                raise ValueError(f"Element at index {action.index} not found in cache")
-            element = self._element_cache[action.index]
-            await element.click()
-            await asyncio.sleep(0.5)
-            
-        elif action.type == "input":
-            if action.index is None or action.text is None:
-                raise ValueError("Input action requires index and text")
-            # Get element from cache
-            if action.index not in self._element_cache:
-                raise ValueError(f"Element at index {action.index} not found in cache")
-            element = self._element_cache[action.index]
-            await element.fill(action.text)
-            await asyncio.sleep(0.3)
-            
-        elif action.type == "navigate":
-            if action.url is None:
-                raise ValueError("Navigate action requires url")
-            await page.goto(action.url)
-            await asyncio.sleep(3)  # Extra wait for JS frameworks like Next.js
-            
-        elif action.type == "scroll":
-            direction = action.direction or "down"
-            amount = action.amount or 500
-            if direction == "down":
-                await page.evaluate(f"window.scrollBy(0, {amount})")
-            else:
-                await page.evaluate(f"window.scrollBy(0, -{amount})")
-            await asyncio.sleep(0.3)
-            
-        elif action.type == "wait":
-            seconds = action.seconds or 1.0
-            await asyncio.sleep(seconds)
-            
-        elif action.type == "extract":
-            # Extract action doesn't modify page, just note it
-            print(f"   Extracting: {action.query}")
-            
-        elif action.type == "done":
-            pass  # Handled in run_task
-            
-        else:
+        handler = self._handlers.get(action.type)
+        if handler is None:
             raise ValueError(f"Unknown action type: {action.type}")
+        await handler(page, action)
+    
+    def _get_cached_element(self, index: int) -> Element:
+        """Get a previously extracted element by its index."""
+        if index not in self._elements_by_index:
+            raise ValueError(f"Element at index {index} not found in cache")
+        return self._elements_by_index[index]
+    
+    async def _do_click(self, page, action: Action):
+        if action.index is None:
+            raise ValueError("Click action requires index")
+        element = self._get_cached_element(action.index)
+        version_before = await self._get_dom_version(page)
+        await element.click()
+        # Right after the click the old document is still loaded and quiet, so it
+        # would count as ready; wait for the click's effect to show up first
+        if await self._wait_for_dom_change(page, version_before, _CLICK_REACTION_TIMEOUT):
+            await self._wait_for_page_ready(page)
+    
+    async def _do_input(self, page, action: Action):
+        if action.index is None or action.text is None:
+            raise ValueError("Input action requires index and text")
+        element = self._get_cached_element(action.index)
+        await element.fill(action.text)
+        await self._wait_for_page_ready(page, timeout=2.0)
+    
+    async def _do_navigate(self, page, action: Action):
+        if action.url is None:
+            raise ValueError("Navigate action requires url")
+        await page.goto(action.url)
+        await self._wait_for_page_ready(page, timeout=10.0)
+    
+    async def _do_scroll(self, page, action: Action):
+        direction = action.direction or "down"
+        amount = action.amount or 500
+        # Page.evaluate only takes arrow functions; the offset goes in as an argument
+        await page.evaluate("(dy) => window.scrollBy(0, dy)", amount if direction == "down" else -amount)
+        await self._wait_for_page_ready(page, timeout=2.0)
+    
+    async def _do_wait(self, page, action: Action):
+        seconds = action.seconds or 1.0
+        await asyncio.sleep(seconds)
+    
+    async def _do_extract(self, page, action: Action):
+        # Extract action doesn't modify page, just note it
+        print(f"   Extracting: {action.query}")
+    
+    async def _do_done(self, page, action: Action):
+        pass  # Handled in run_task
+    
+    async def _wait_for_dom_change(self, page, version_before: Optional[str], timeout: float) -> bool:
+        """
+        Wait until the page's DOM version differs from `version_before`.
+        
+        A new document changes the token, DOM updates change the mutation count,
+        and while a navigation is tearing down the old document the version
+        can't be read at all; all three count as a change.
+        
+        Args:
+            page: Actor page to watch
+            version_before: Version read before the action (None if unavailable)
+            timeout: Maximum number of seconds to wait
+        
+        Returns:
+            False if nothing changed within `timeout`
+        """
+        if version_before is None:
+            return True
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while loop.time() < deadline:
+            if await self._get_dom_version(page) != version_before:
+                return True
+            await asyncio.sleep(0.05)
+        return False
+    
+    async def _wait_for_page_ready(self, page, timeout: float = 5.0, quiet_ms: int = 300):
+        """
+        Wait until the page has loaded and its DOM has settled.
+        
+        Returns as soon as the page is ready on fast sites and keeps waiting
+        (up to `timeout`) on slow ones.
+        
+        Args:
+            page: Actor page to wait on
+            timeout: Maximum number of seconds to wait
+            quiet_ms: How long the DOM must stay unchanged to count as settled
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                await asyncio.wait_for(
+                    page.evaluate(_PAGE_READY_JS, quiet_ms, int(remaining * 1000)),
+                    timeout=remaining,
+                )
+                return
+            except asyncio.TimeoutError:
+                return
+            except Exception:
+                # The execution context was torn down by a navigation that is
+                # still in flight; retry against the new document
+                await asyncio.sleep(0.1)
@@ -2,13 +2,8 @@
 
 import argparse
 import asyncio
-import sys
-from pathlib import Path
 
-# Add parent directory to path
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
-from local.client import LocalBrowserClient
+from prototype.local.client import LocalBrowserClient
 
 
 async def main():
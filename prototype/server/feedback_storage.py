@@ -1,12 +1,37 @@
 """Storage for UX feedback."""
 
-import json
+import asyncio
+import logging
+from collections import Counter
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
-from shared.models import UXFeedback
+from prototype.shared.models import UX_FEEDBACK_LIST_ADAPTER, UXFeedback
 
+logger = logging.getLogger(__name__)
+
+# Fixed report layout, built and UTF-8 encoded once at import
+_EQ = "=" * 80
+_DASH = "-" * 80
+_REPORT_HEADER = f"{_EQ}\nUX SPECIALIST ANALYSIS REPORT\n{_EQ}\n".encode()
+_SUMMARY_HEADER = f"{_DASH}\nSUMMARY STATISTICS\n{_DASH}\n".encode()
+_DETAILS_HEADER = f"{_DASH}\nDETAILED STEP-BY-STEP ANALYSIS\n{_DASH}\n".encode()
+_INSIGHTS_HEADER = f"\n{_EQ}\nKEY INSIGHTS\n{_EQ}\n".encode()
+_CONCLUSION_HEADER = f"\n{_EQ}\nCONCLUSION\n{_EQ}\n".encode()
+_ISSUES_HEADER = "ISSUES IDENTIFIED:\n  • ".encode()
+_ISSUES_SEP = "\n  • ".encode()
+_STEP_TMPL = (
+    f"\n{_EQ}\nSTEP {{idx}}\n{_EQ}\n"
+    "URL: {url}\n"
+    "Confidence: {conf:.2f}\n"
+    "Priority: {prio}\n"
+    "\n"
+    "RECOMMENDATION:\n"
+    "  {rec}\n"
+    "\n"
+)
+_NO_FEEDBACK = "No feedback data available to generate report."
 
 class FeedbackStorage:
     """Simple storage for UX feedback."""
@@ -16,11 +41,18 @@ class FeedbackStorage:
         Initialize feedback storage.
         
         Args:
-            storage_path: Path to store feedback JSON file. If None, uses memory only.
+            storage_path: Path to store feedback JSON Lines file. If None, uses memory only.
         """
         self.storage_path = storage_path
         self.feedback_list: list[UXFeedback] = []
         
+        # Running aggregates so get_summary() doesn't rescan feedback_list
+        self._conf_sum = 0.0
+        self._urls: Counter[str] = Counter()
+        self._prio = {"high": 0, "medium": 0, "low": 0}
+        self._issues: set[str] = set()
+        self._high_conf = 0
+        
         # Load existing feedback if file exists
         if storage_path and storage_path.exists():
             self._load_from_file()
@@ -28,15 +60,35 @@ class FeedbackStorage:
     def store(self, feedback: UXFeedback):
         """Store a new feedback entry."""
         self.feedback_list.append(feedback)
+        self._track(feedback)
+        
+        # Append to file if path is set; earlier records are never rewritten
+        if self.storage_path:
+            self._append_to_file(feedback)
+    
+    async def astore(self, feedback: UXFeedback):
+        """Store a new feedback entry without blocking the event loop on disk I/O."""
+        self.feedback_list.append(feedback)
+        self._track(feedback)
         
-        # Persist to file if path is set
         if self.storage_path:
-            self._save_to_file()
+            # The worker thread can't be stopped once started; if the caller is
+            # cancelled, still wait for the write so it can't land after a clear()
+            write = asyncio.ensure_future(asyncio.to_thread(self._append_to_file, feedback))
+            try:
+                await asyncio.shield(write)
+            except asyncio.CancelledError:
+                await write
+                raise
     
     def get_all(self) -> list[UXFeedback]:
         """Get all stored feedback."""
         return self.feedback_list
     
+    def get_all_json(self) -> bytes:
+        """Get all stored feedback as a JSON array, encoded in one pass."""
+        return UX_FEEDBACK_LIST_ADAPTER.dump_json(self.feedback_list)
+    
     def get_by_url(self, url: str) -> list[UXFeedback]:
         """Get feedback for a specific URL."""
         return [f for f in self.feedback_list if f.url == url]
@@ -48,12 +100,14 @@ class FeedbackStorage:
     def clear(self):
         """Clear all stored feedback."""
         self.feedback_list.clear()
+        self._reset_aggregates()
         if self.storage_path and self.storage_path.exists():
             self.storage_path.unlink()
     
     def get_summary(self) -> dict:
         """Get summary statistics."""
-        if not self.feedback_list:
+        total = len(self.feedback_list)
+        if not total:
             return {
                 "total_feedback": 0,
                 "average_confidence": 0,
@@ -61,42 +115,74 @@ class FeedbackStorage:
             }
         
         return {
-            "total_feedback": len(self.feedback_list),
-            "average_confidence": sum(f.confidence for f in self.feedback_list) / len(self.feedback_list),
-            "unique_urls": len(set(f.url for f in self.feedback_list)),
-            "priority_distribution": {
-                "high": sum(1 for f in self.feedback_list if f.priority == "high"),
-                "medium": sum(1 for f in self.feedback_list if f.priority == "medium"),
-                "low": sum(1 for f in self.feedback_list if f.priority == "low"),
-            }
+            "total_feedback": total,
+            "average_confidence": self._conf_sum / total,
+            "unique_urls": len(self._urls),
+            "priority_distribution": dict(self._prio),
         }
     
-    def _save_to_file(self):
-        """Save feedback to JSON file."""
+    def _track(self, feedback: UXFeedback):
+        """Fold a feedback entry into the running aggregates."""
+        self._conf_sum += feedback.confidence
+        self._urls[feedback.url] += 1
+        self._prio[feedback.priority] += 1
+        self._issues.update(feedback.issues)
+        if feedback.confidence >= 0.9:
+            self._high_conf += 1
+    
+    def _reset_aggregates(self):
+        """Reset the running aggregates."""
+        self._conf_sum = 0.0
+        self._urls = Counter()
+        self._prio = {"high": 0, "medium": 0, "low": 0}
+        self._issues = set()
+        self._high_conf = 0
+    
+    def compact(self):
+        """Rewrite the storage file from memory, one JSON record per line."""
+        if not self.storage_path:
+            return
+        
+        self.storage_path.parent.mkdir(parents=True, exist_ok=True)
+        self.storage_path.write_bytes(
+            b"".join(f.model_dump_json().encode() + b"\n" for f in self.feedback_list)
+        )
+    
+    def _append_to_file(self, feedback: UXFeedback):
+        """Append a single feedback record to the JSON Lines file."""
         if not self.storage_path:
             return
         
         # Ensure directory exists
         self.storage_path.parent.mkdir(parents=True, exist_ok=True)
         
-        # Convert to dict and save
-        data = [f.model_dump() for f in self.feedback_list]
-        with open(self.storage_path, 'w') as f:
-            json.dump(data, f, indent=2)
+        with open(self.storage_path, "ab") as f:
+            f.write(feedback.model_dump_json().encode() + b"\n")
     
     def _load_from_file(self):
-        """Load feedback from JSON file."""
+        """Load feedback from JSON Lines file (or a legacy JSON array)."""
         if not self.storage_path or not self.storage_path.exists():
             return
         
         try:
-            with open(self.storage_path, 'r') as f:
-                data = json.load(f)
-            
-            self.feedback_list = [UXFeedback(**item) for item in data]
+            data = self.storage_path.read_bytes()
+            if data.lstrip().startswith(b"["):
+                # Older files hold a single JSON array; rewrite them as JSON Lines
+                self.feedback_list = UX_FEEDBACK_LIST_ADAPTER.validate_json(data)
+                self.compact()
+            else:
+                self.feedback_list = [
+                    UXFeedback.model_validate_json(line)
+                    for line in data.splitlines()
+                    if line.strip()
+                ]
         except Exception as e:
-            print(f"Warning: Failed to load feedback from {self.storage_path}: {e}")
+            logger.warning("Failed to load feedback from %s: %s", self.storage_path, e)
             self.feedback_list = []
+        
+        self._reset_aggregates()
+        for feedback in self.feedback_list:
+            self._track(feedback)
     
     def generate_report(self, task: str, output_path: Optional[Path] = None) -> str:
         """
@@ -109,89 +195,90 @@ class FeedbackStorage:
         Returns:
             The report as a string
         """
+        return self.generate_report_bytes(task, output_path).decode("utf-8")
+    
+    def generate_report_bytes(self, task: str, output_path: Optional[Path] = None) -> bytes:
+        """
+        Generate the UX analysis report as UTF-8 bytes.
+        
+        Same content as generate_report(), for callers that write or send bytes.
+        
+        Args:
+            task: The task that was performed
+            output_path: Optional path to save the report
+        
+        Returns:
+            The report, UTF-8 encoded
+        """
         if not self.feedback_list:
-            return "No feedback data available to generate report."
-        
-        # Build report
-        report_lines = []
-        report_lines.append("=" * 80)
-        report_lines.append("UX SPECIALIST ANALYSIS REPORT")
-        report_lines.append("=" * 80)
-        report_lines.append(f"\nGenerated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        report_lines.append(f"Task: {task}")
-        report_lines.append(f"Total Steps Analyzed: {len(self.feedback_list)}")
-        report_lines.append("")
+            return _NO_FEEDBACK.encode()
+        
+        buf = bytearray()
+        
+        # Header
+        buf += _REPORT_HEADER
+        buf += (
+            f"\nGenerated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+            f"Task: {task}\n"
+            f"Total Steps Analyzed: {len(self.feedback_list)}\n"
+            "\n"
+        ).encode()
         
         # Summary statistics
         summary = self.get_summary()
-        report_lines.append("-" * 80)
-        report_lines.append("SUMMARY STATISTICS")
-        report_lines.append("-" * 80)
-        report_lines.append(f"Average Confidence Score: {summary['average_confidence']:.2f}")
-        report_lines.append(f"Unique URLs Visited: {summary['unique_urls']}")
-        report_lines.append(f"Priority Distribution:")
-        for priority, count in summary['priority_distribution'].items():
-            report_lines.append(f"  - {priority.capitalize()}: {count}")
-        report_lines.append("")
+        buf += _SUMMARY_HEADER
+        buf += (
+            f"Average Confidence Score: {summary['average_confidence']:.2f}\n"
+            f"Unique URLs Visited: {summary['unique_urls']}\n"
+            "Priority Distribution:\n"
+            + "".join(
+                f"  - {priority.capitalize()}: {count}\n"
+                for priority, count in summary['priority_distribution'].items()
+            )
+            + "\n"
+        ).encode()
         
         # Detailed feedback per step
-        report_lines.append("-" * 80)
-        report_lines.append("DETAILED STEP-BY-STEP ANALYSIS")
-        report_lines.append("-" * 80)
+        buf += _DETAILS_HEADER
         
         for idx, feedback in enumerate(self.feedback_list, 1):
-            report_lines.append(f"\n{'='*80}")
-            report_lines.append(f"STEP {idx}")
-            report_lines.append(f"{'='*80}")
-            report_lines.append(f"URL: {feedback.url}")
-            report_lines.append(f"Confidence: {feedback.confidence:.2f}")
-            report_lines.append(f"Priority: {feedback.priority.upper()}")
-            report_lines.append("")
-            report_lines.append("RECOMMENDATION:")
-            report_lines.append(f"  {feedback.recommendation}")
-            report_lines.append("")
+            buf += _STEP_TMPL.format(
+                idx=idx,
+                url=feedback.url,
+                conf=feedback.confidence,
+                prio=feedback.priority.upper(),
+                rec=feedback.recommendation,
+            ).encode()
             
             if feedback.issues:
-                report_lines.append("ISSUES IDENTIFIED:")
-                for issue in feedback.issues:
-                    report_lines.append(f"  • {issue}")
-                report_lines.append("")
+                buf += _ISSUES_HEADER
+                buf += _ISSUES_SEP.join(issue.encode() for issue in feedback.issues)
+                buf += b"\n\n"
         
         # Key insights
-        report_lines.append("\n" + "=" * 80)
-        report_lines.append("KEY INSIGHTS")
-        report_lines.append("=" * 80)
-        
-        # Find high-confidence recommendations
-        high_conf = [f for f in self.feedback_list if f.confidence >= 0.9]
-        if high_conf:
-            report_lines.append(f"\n✓ {len(high_conf)} high-confidence recommendations (≥0.9)")
+        buf += _INSIGHTS_HEADER
         
-        # Find all unique issues
-        all_issues = set()
-        for f in self.feedback_list:
-            all_issues.update(f.issues)
+        # High-confidence recommendations and unique issues come from the running aggregates
+        if self._high_conf:
+            buf += f"\n✓ {self._high_conf} high-confidence recommendations (≥0.9)\n".encode()
         
-        if all_issues:
-            report_lines.append(f"\n⚠ {len(all_issues)} unique UX issues identified across all steps")
+        if self._issues:
+            buf += f"\n⚠ {len(self._issues)} unique UX issues identified across all steps\n".encode()
         
         # Conclusion
-        report_lines.append("\n" + "=" * 80)
-        report_lines.append("CONCLUSION")
-        report_lines.append("=" * 80)
         final_feedback = self.feedback_list[-1]
-        report_lines.append(f"Final URL: {final_feedback.url}")
-        report_lines.append(f"Final Recommendation: {final_feedback.recommendation}")
-        report_lines.append("")
+        buf += _CONCLUSION_HEADER
+        buf += (
+            f"Final URL: {final_feedback.url}\n"
+            f"Final Recommendation: {final_feedback.recommendation}\n"
+        ).encode()
         
-        # Join all lines
-        report = "\n".join(report_lines)
+        report = bytes(buf)
         
         # Save to file if path provided
         if output_path:
             output_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(report)
-            print(f"✓ Report saved to: {output_path}")
+            output_path.write_bytes(report)
+            logger.info("✓ Report saved to: %s", output_path)
         
         return report
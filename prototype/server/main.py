@@ -1,34 +1,77 @@
 """FastAPI server that coordinates Navigation and UX Specialist agents."""
 
-import sys
+import asyncio
+import json
+import logging
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
 
-from fastapi import FastAPI, HTTPException
+import orjson
+from fastapi import Depends, FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, ValidationError
 
-# Add parent directory to path
-sys.path.insert(0, str(Path(__file__).parent.parent))
+from prototype.shared.models import (
+    MSGPACK_AVAILABLE,
+    MSGPACK_MEDIA_TYPE,
+    UX_FEEDBACK_LIST_ADAPTER,
+    Action,
+    BatchNavigationRequest,
+    BatchNavigationResponse,
+    ModelT,
+    NavigationRequest,
+    NavigationResponse,
+    UXFeedback,
+    build_response,
+    decode_batch_request,
+    decode_request,
+    encode_batch_response,
+    encode_response,
+    from_msgpack,
+    to_msgpack,
+)
+from prototype.server.navigation_agent import NavigationAgent
+from prototype.server.ux_specialist import UXSpecialist
+from prototype.server.feedback_storage import FeedbackStorage
+
+# Request logging for the whole server package. %-style arguments are only
+# formatted when a record is actually emitted, so lowering the level to WARNING
+# takes logging off the per-request path entirely.
+logger = logging.getLogger("prototype.server")
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    # browser_use configures the root logger too; don't print every line twice
+    logger.propagate = False
 
-from shared.models import NavigationRequest, NavigationResponse
-from server.navigation_agent import NavigationAgent
-from server.ux_specialist import UXSpecialist
-from server.feedback_storage import FeedbackStorage
+# LLM class, resolved on startup so importing this module stays cheap
+LLM_CLASS = None
 
-# Import LLM - you can change this to your preferred LLM
-try:
-    from browser_use import ChatBrowserUse
-    LLM_CLASS = ChatBrowserUse
-except ImportError:
-    from langchain_openai import ChatOpenAI
-    LLM_CLASS = ChatOpenAI
+_RULE = "=" * 60
+
+# Finished UX analyses waiting for the GET /ux subscriber. Bounded so nothing piles
+# up while no client listens; everything is in feedback_storage regardless.
+_UX_QUEUE_SIZE = 64
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson, for endpoints that return plain dicts."""
+    
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
 
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Browser Agent Server",
     description="Cloud server for Navigation and UX Specialist agents",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -44,14 +87,25 @@ app.add_middleware(
 navigation_agent: NavigationAgent = None
 ux_specialist: UXSpecialist = None
 feedback_storage: FeedbackStorage = None
+ux_queue: Optional[asyncio.Queue] = None
+
+# UX analyses still running; holds references so the tasks aren't garbage collected
+_ux_tasks: set[asyncio.Task] = set()
 
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize agents on server startup."""
-    global navigation_agent, ux_specialist, feedback_storage
+    global navigation_agent, ux_specialist, feedback_storage, ux_queue, LLM_CLASS
+    
+    logger.info("🚀 Initializing agents...")
     
-    print("🚀 Initializing agents...")
+    # Import LLM - you can change this to your preferred LLM
+    if LLM_CLASS is None:
+        try:
+            from browser_use import ChatBrowserUse as LLM_CLASS
+        except ImportError:
+            from langchain_openai import ChatOpenAI as LLM_CLASS
     
     # Initialize LLMs (you can use different models for each agent)
     nav_llm = LLM_CLASS(temperature=0.1)
@@ -61,10 +115,12 @@ async def startup_event():
     navigation_agent = NavigationAgent(llm=nav_llm)
     ux_specialist = UXSpecialist(llm=ux_llm)
     feedback_storage = FeedbackStorage()
+    ux_queue = asyncio.Queue(maxsize=_UX_QUEUE_SIZE)
     
-    print("✅ Agents initialized")
-    print(f"   - Navigation Agent: {type(nav_llm).__name__}")
-    print(f"   - UX Specialist: {type(ux_llm).__name__}")
+    logger.info(
+        "✅ Agents initialized\n   - Navigation Agent: %s\n   - UX Specialist: %s",
+        type(nav_llm).__name__, type(ux_llm).__name__
+    )
 
 
 @app.get("/")
@@ -87,71 +143,257 @@ async def health():
             "ux_specialist": ux_specialist is not None,
         },
         "stats": {
-            "navigation_steps": len(navigation_agent.history) if navigation_agent else 0,
-            "ux_analyses": len(ux_specialist.feedback_history) if ux_specialist else 0,
+            "navigation_steps": navigation_agent.total_steps if navigation_agent else 0,
+            "ux_analyses": ux_specialist.total_analyzed if ux_specialist else 0,
         }
     }
 
 
+def _request_validation_error(e: ValidationError, *loc: str) -> RequestValidationError:
+    """Report a manually validated body the way FastAPI reports its own body errors."""
+    errors = e.errors(include_url=False)
+    for error in errors:
+        error["loc"] = (*loc, *error["loc"])
+    return RequestValidationError(errors)
+
+
+async def _read_body(http_request: Request, model_cls: type[ModelT], decode_json) -> ModelT:
+    """Decode the request body as JSON or, if the client sent it, MessagePack."""
+    body = await http_request.body()
+    try:
+        if http_request.headers.get("content-type", "").startswith(MSGPACK_MEDIA_TYPE):
+            if not MSGPACK_AVAILABLE:
+                raise HTTPException(status_code=415, detail="MessagePack support requires msgspec")
+            return from_msgpack(model_cls, body)
+        return decode_json(body)
+    except ValidationError as e:
+        raise _request_validation_error(e, "body")
+    except ValueError as e:
+        # msgspec.DecodeError: not MessagePack at all
+        raise HTTPException(status_code=400, detail=f"Invalid MessagePack body: {e}")
+
+
+async def _read_navigation_request(http_request: Request) -> NavigationRequest:
+    """Body of POST /navigate."""
+    return await _read_body(http_request, NavigationRequest, decode_request)
+
+
+async def _read_batch_request(http_request: Request) -> BatchNavigationRequest:
+    """Body of POST /navigate/batch."""
+    return await _read_body(http_request, BatchNavigationRequest, decode_batch_request)
+
+
+def _encoded_response(http_request: Request, response: BaseModel, encode_json) -> Response:
+    """Send a response model as MessagePack if the `Accept` header asks for it, else JSON."""
+    if MSGPACK_AVAILABLE and MSGPACK_MEDIA_TYPE in http_request.headers.get("accept", ""):
+        return Response(content=to_msgpack(response), media_type=MSGPACK_MEDIA_TYPE)
+    # Encoded by pydantic-core directly; the dict-oriented default response class would
+    # otherwise send the model through jsonable_encoder first
+    return Response(content=encode_json(response), media_type="application/json")
+
+
+def _publish_ux(ux_feedback: UXFeedback):
+    """Queue feedback for GET /ux, dropping the oldest entry if nobody is reading."""
+    if ux_queue.full():
+        ux_queue.get_nowait()
+    ux_queue.put_nowait(ux_feedback)
+
+
+async def _analyze_ux(request: NavigationRequest):
+    """Run the UX analysis of a page off the response path, then store and publish it."""
+    try:
+        ux_feedback = await ux_specialist.analyze_page(
+            state=request.state,
+            task=request.task,
+            step_number=request.step_number
+        )
+        await feedback_storage.astore(ux_feedback)
+        logger.info("   ✓ UX Analysis (step %d): %.60s...", request.step_number, ux_feedback.recommendation)
+        _publish_ux(ux_feedback)
+    except Exception as e:
+        logger.exception("   ❌ UX analysis failed (step %d): %s", request.step_number, e)
+
+
+def _start_ux_analysis(request: NavigationRequest):
+    """Start `_analyze_ux` in the background."""
+    task = asyncio.create_task(_analyze_ux(request))
+    _ux_tasks.add(task)
+    task.add_done_callback(_ux_tasks.discard)
+
+
+async def _navigate_step(request: NavigationRequest) -> Action:
+    """
+    Handle one navigation step; shared by /navigate, /navigate/batch and /navigate/stream.
+    
+    Flow:
+    1. UX analysis of the page starts in the background; its feedback is
+       stored and published on GET /ux when it finishes
+    2. Navigation Agent decides the next action from the latest known UX
+       feedback (the previous page's), without waiting for that analysis
+    """
+    logger.info(
+        "\n%s\n📥 Request - Step %d\n   URL: %s\n   Task: %s",
+        _RULE, request.step_number, request.state.url, request.task
+    )
+    
+    # Feedback for the previous page; the current one is analyzed concurrently
+    previous_feedback = ux_specialist.feedback_history[-1] if ux_specialist.feedback_history else None
+    
+    # 1. Start the UX analysis
+    logger.info("   🎨 UX Specialist analyzing (background)...")
+    _start_ux_analysis(request)
+    
+    # 2. Decide the next action
+    logger.info("   🧭 Navigation Agent deciding...")
+    action = await navigation_agent.decide_action(
+        state=request.state,
+        task=request.task,
+        ux_feedback=previous_feedback,
+        step_number=request.step_number
+    )
+    logger.info("   ✓ Action: %s", action.type)
+    return action
+
+
+def _step_message(request: NavigationRequest) -> str:
+    """Status message sent along with a step's action."""
+    return f"Step {request.step_number} completed"
+
+
 @app.post("/navigate", response_model=NavigationResponse)
-async def navigate(request: NavigationRequest):
+async def navigate(
+    http_request: Request,
+    request: NavigationRequest = Depends(_read_navigation_request),
+):
     """
     Main endpoint: receives browser state and returns next action.
     
-    Flow:
-    1. UX Specialist analyzes the page
-    2. Feedback is stored
-    3. Navigation Agent decides next action
-    4. Response is returned to client
+    Speaks JSON by default. With msgspec installed, the body may be MessagePack
+    (`Content-Type: application/vnd.msgpack`) and the response is MessagePack
+    when the `Accept` header asks for it.
+    
+    UX feedback is not part of the response; see GET /ux.
     """
     if not navigation_agent or not ux_specialist:
         raise HTTPException(status_code=500, detail="Agents not initialized")
     
     try:
-        print(f"\n{'='*60}")
-        print(f"📥 Request - Step {request.step_number}")
-        print(f"   URL: {request.state.url}")
-        print(f"   Task: {request.task}")
-        
-        # 1. UX Specialist analyzes the page
-        print("   🎨 UX Specialist analyzing...")
-        ux_feedback = await ux_specialist.analyze_page(
-            state=request.state,
-            task=request.task,
-            step_number=request.step_number
-        )
-        
-        # 2. Store feedback
-        feedback_storage.store(ux_feedback)
-        print(f"   ✓ UX Analysis: {ux_feedback.recommendation[:60]}...")
+        action = await _navigate_step(request)
+        response = build_response(action=action, message=_step_message(request))
+        logger.info("   📤 Response sent")
+        return _encoded_response(http_request, response, encode_response)
         
-        # 3. Navigation Agent decides action
-        print("   🧭 Navigation Agent deciding...")
-        action = await navigation_agent.decide_action(
-            state=request.state,
-            task=request.task,
-            ux_feedback=ux_feedback,
-            step_number=request.step_number
-        )
-        print(f"   ✓ Action: {action.type}")
-        
-        # 4. Build response
-        response = NavigationResponse(
-            action=action,
-            ux_feedback=ux_feedback,
-            message=f"Step {request.step_number} completed"
+    except Exception as e:
+        logger.exception("   ❌ Error: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/navigate/batch", response_model=BatchNavigationResponse)
+async def navigate_batch(
+    http_request: Request,
+    batch: BatchNavigationRequest = Depends(_read_batch_request),
+):
+    """
+    Several /navigate steps in one round trip.
+    
+    Items are handled in order, exactly as if each had been sent to /navigate,
+    and the response lists their results in the same order. Encoding works as
+    for /navigate.
+    """
+    if not navigation_agent or not ux_specialist:
+        raise HTTPException(status_code=500, detail="Agents not initialized")
+    
+    try:
+        items = [
+            build_response(action=await _navigate_step(request), message=_step_message(request))
+            for request in batch.items
+        ]
+        logger.info("   📤 Batch response sent (%d steps)", len(items))
+        return _encoded_response(
+            http_request,
+            BatchNavigationResponse.model_construct(items=items),
+            encode_batch_response
         )
         
-        print("   📤 Response sent")
-        return response
-        
     except Exception as e:
-        print(f"   ❌ Error: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("   ❌ Error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _sse(event: str, data: str) -> str:
+    """Format a single server-sent event."""
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+@app.post("/navigate/stream")
+async def navigate_stream(
+    request_json: str = Form(..., alias="request", description="NavigationRequest as JSON"),
+    screenshot: Optional[UploadFile] = File(None, description="Screenshot (WebP) for state.screenshot_ref"),
+):
+    """
+    Streaming variant of /navigate, sent as server-sent events.
+    
+    Takes multipart/form-data: the NavigationRequest JSON in a `request` part and
+    the screenshot, if any, as raw bytes in a `screenshot` part.
+    
+    The UX analysis of the page runs in the background, as in /navigate, and
+    its feedback is published on GET /ux.
+    
+    Events, in order:
+    1. `action` - the next Action, decided from the latest known UX feedback
+    2. `message` - a short status message
+    
+    An `error` event replaces whatever is left if something fails.
+    """
+    if not navigation_agent or not ux_specialist:
+        raise HTTPException(status_code=500, detail="Agents not initialized")
+    
+    try:
+        request = decode_request(request_json)
+    except ValidationError as e:
+        raise _request_validation_error(e, "body", "request")
+    if screenshot is not None:
+        # Read now: the upload is closed once the response is sent, while the
+        # UX analysis of this state keeps running in the background
+        request.state._screenshot = await screenshot.read()
+    
+    async def events():
+        try:
+            action = await _navigate_step(request)
+            yield _sse("action", action.model_dump_json())
+            
+            yield _sse("message", _step_message(request))
+            logger.info("   📤 Stream completed")
+            
+        except Exception as e:
+            logger.exception("   ❌ Error: %s", e)
+            yield _sse("error", json.dumps({"detail": str(e)}))
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.get("/ux")
+async def ux_stream():
+    """
+    UX feedback as server-sent events, published as analyses finish.
+    
+    Each `ux_feedback` event carries a JSON array of every UXFeedback ready at
+    that moment, so a burst goes out as one frame. Meant for a single
+    subscriber (the local client connects once per session).
+    """
+    if not ux_queue:
+        raise HTTPException(status_code=500, detail="Agents not initialized")
+    
+    async def events():
+        while True:
+            batch = [await ux_queue.get()]
+            while not ux_queue.empty():
+                batch.append(ux_queue.get_nowait())
+            yield _sse("ux_feedback", UX_FEEDBACK_LIST_ADAPTER.dump_json(batch).decode())
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
 @app.get("/stats")
 async def get_stats():
     """Get statistics about the current session."""
@@ -171,9 +413,11 @@ async def get_feedback():
     if not feedback_storage:
         raise HTTPException(status_code=500, detail="Storage not initialized")
     
-    return {
-        "feedback": [f.model_dump() for f in feedback_storage.get_all()]
-    }
+    # Serialized once by pydantic-core instead of model_dump() + jsonable_encoder
+    return Response(
+        content=b'{"feedback":' + feedback_storage.get_all_json() + b"}",
+        media_type="application/json"
+    )
 
 
 @app.post("/report")
@@ -184,6 +428,10 @@ async def generate_report(request: dict):
     
     task = request.get("task", "Unknown task")
     
+    # Include the pages whose UX analysis is still running
+    if _ux_tasks:
+        await asyncio.gather(*_ux_tasks, return_exceptions=True)
+    
     # Generate report
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     report_filename = f"ux_report_{timestamp}.txt"
@@ -204,12 +452,21 @@ async def reset():
     """Reset all agents and clear history."""
     global navigation_agent, ux_specialist, feedback_storage
     
+    # Stop the running UX analyses first, so none of them stores feedback after the clear
+    if _ux_tasks:
+        for task in _ux_tasks:
+            task.cancel()
+        await asyncio.gather(*_ux_tasks, return_exceptions=True)
+    
     if navigation_agent:
-        navigation_agent.history.clear()
+        navigation_agent.reset()
     if ux_specialist:
-        ux_specialist.feedback_history.clear()
+        ux_specialist.reset()
     if feedback_storage:
         feedback_storage.clear()
+    if ux_queue:
+        while not ux_queue.empty():
+            ux_queue.get_nowait()
     
     return {"status": "reset", "message": "All agents cleared"}
 
@@ -1,11 +1,29 @@
 """Navigation Agent - Makes decisions on what actions to take."""
 
-import json
+import logging
+from collections import deque
+from itertools import islice
 from typing import Optional
 
-from browser_use.llm.messages import SystemMessage, UserMessage
+from pydantic import TypeAdapter
 
-from shared.models import Action, BrowserState, UXFeedback
+from prototype.shared.models import Action, BrowserState, UXFeedback
+from prototype.server.utils import HISTORY_LIMIT, build_messages, parse_llm_json, state_dom_summary
+
+logger = logging.getLogger(__name__)
+
+_ACTION_ADAPTER = TypeAdapter(Action)
+
+# Returned when the LLM response can't be parsed, with the error as its reasoning
+_FALLBACK_WAIT = Action(
+    type="wait",
+    seconds=1.0,
+    reasoning="Failed to parse action, waiting to retry"
+)
+
+
+def _fallback_wait(error: Exception) -> Action:
+    return _FALLBACK_WAIT.model_copy(update={"reasoning": f"Failed to parse action: {error}"})
 
 
 class NavigationAgent:
@@ -19,7 +37,9 @@ class NavigationAgent:
             llm: Language model instance (e.g., ChatBrowserUse, ChatOpenAI)
         """
         self.llm = llm
-        self.history: list[dict] = []
+        self.history: deque[dict] = deque(maxlen=HISTORY_LIMIT)
+        self.total_steps = 0  # keeps counting once history is full
+        self._urls_visited: set[str] = set()
         
         self.system_prompt = """You are a Navigation Agent AI specialized in web automation. Your role is to:
 
@@ -76,7 +96,7 @@ EXAMPLE navigate actions:
         self,
         state: BrowserState,
         task: str,
-        ux_feedback: UXFeedback,
+        ux_feedback: Optional[UXFeedback],
         step_number: int = 0
     ) -> Action:
         """
@@ -85,7 +105,8 @@ EXAMPLE navigate actions:
         Args:
             state: Current browser state
             task: User's task
-            ux_feedback: Feedback from UX Specialist
+            ux_feedback: Feedback from UX Specialist. May be for an earlier page
+                (or None) when the current page is still being analyzed.
             step_number: Current step number
             
         Returns:
@@ -95,49 +116,37 @@ EXAMPLE navigate actions:
         prompt = self._build_decision_prompt(state, task, ux_feedback, step_number)
         
         # Get LLM decision with proper message format
-        messages = [
-            SystemMessage(content=self.system_prompt),
-            UserMessage(content=prompt)
-        ]
-        
-        response = await self.llm.ainvoke(messages)
-        
-        # Parse action from response
-        try:
-            # Log raw response for debugging
-            print(f"\n🤖 Raw LLM Response (first 500 chars):\n{response.completion[:500]}\n")
-            
-            action_data = self._parse_response(response.completion)
-            print(f"📋 Parsed JSON: {action_data}")
-            
-            action = Action(**action_data)
-            
-            # Log all navigate actions with their URLs for debugging
-            if action.type == "navigate":
-                print(f"🔍 Navigate action parsed: url='{action.url}'")
-                if not action.url:
-                    print(f"⚠️  WARNING: Navigate action missing URL!")
-                    print(f"📄 Full LLM response: {response.completion[:500]}")
-                    # Default to Google as fallback
-                    action.url = "https://www.google.com"
-                    action.reasoning = f"Fallback: {action.reasoning or 'Navigate action was missing URL'}"
-                
-        except Exception as e:
-            print(f"Warning: Failed to parse action: {e}")
-            print(f"Response: {response.completion}")
-            # Default to wait action if parsing fails
-            action = Action(
-                type="wait",
-                seconds=1.0,
-                reasoning="Failed to parse action, waiting to retry"
-            )
+        response = await self.llm.ainvoke(build_messages(self.system_prompt, prompt))
+        
+        # Log raw response for debugging
+        logger.debug("\n🤖 Raw LLM Response (first 500 chars):\n%.500s\n", response.completion)
+        
+        # Parse action from response, defaulting to a wait if parsing fails
+        action = parse_llm_json(response.completion, _ACTION_ADAPTER, _fallback_wait)
+        logger.debug("📋 Parsed action: %r", action)
+        
+        # Log all navigate actions with their URLs for debugging
+        if action.type == "navigate":
+            logger.debug("🔍 Navigate action parsed: url='%s'", action.url)
+            if not action.url:
+                logger.warning(
+                    "⚠️  WARNING: Navigate action missing URL!\n📄 Full LLM response: %.500s",
+                    response.completion
+                )
+                # Default to Google as fallback
+                action = action.model_copy(update={
+                    "url": "https://www.google.com",
+                    "reasoning": f"Fallback: {action.reasoning or 'Navigate action was missing URL'}",
+                })
         
         # Store in history
+        self.total_steps += 1
+        self._urls_visited.add(state.url)
         self.history.append({
             "step": step_number,
             "url": state.url,
             "action": action.model_dump(),
-            "ux_confidence": ux_feedback.confidence
+            "ux_confidence": ux_feedback.confidence if ux_feedback else None
         })
         
         return action
@@ -146,19 +155,19 @@ EXAMPLE navigate actions:
         self,
         state: BrowserState,
         task: str,
-        ux_feedback: UXFeedback,
+        ux_feedback: Optional[UXFeedback],
         step_number: int
     ) -> str:
         """Build the decision prompt for the LLM."""
         
         # Summarize DOM elements
-        dom_summary = self._summarize_dom(state.dom_elements)
+        dom_summary = state_dom_summary(state, max_elements=30)
         
         # Get action history
         action_history = ""
         if len(self.history) > 0:
             action_history = "\n\nPrevious actions:\n"
-            recent = self.history[-5:]  # Last 5 actions
+            recent = islice(self.history, max(0, len(self.history) - 5), None)  # Last 5 actions
             for entry in recent:
                 action_history += f"Step {entry['step']}: {entry['action']['type']}"
                 if entry['action'].get('reasoning'):
@@ -173,11 +182,7 @@ CURRENT URL: {state.url}
 PAGE TITLE: {state.title}
 
 UX SPECIALIST FEEDBACK:
-Recommendation: {ux_feedback.recommendation}
-Confidence: {ux_feedback.confidence}
-Priority: {ux_feedback.priority}
-Issues: {', '.join(ux_feedback.issues) if ux_feedback.issues else 'None'}
-Positive aspects: {', '.join(ux_feedback.positive_aspects) if ux_feedback.positive_aspects else 'None'}
+{self._format_ux_feedback(ux_feedback, state.url)}
 
 AVAILABLE ELEMENTS:
 {dom_summary}
@@ -202,57 +207,31 @@ Only include fields relevant to the action type."""
         
         return prompt
     
-    def _summarize_dom(self, dom_elements: list[dict], max_elements: int = 30) -> str:
-        """Summarize DOM elements for the prompt."""
-        if not dom_elements:
-            return "No interactive elements found."
-        
-        summary_lines = []
-        for i, elem in enumerate(dom_elements[:max_elements]):
-            text = elem.get('text', '')[:60]
-            tag = elem.get('tag', 'unknown')
-            index = elem.get('index', i)
-            
-            # Include relevant attributes
-            attrs = elem.get('attributes', {})
-            attr_str = ""
-            if attrs.get('placeholder'):
-                attr_str += f" placeholder='{attrs['placeholder'][:30]}'"
-            if attrs.get('aria-label'):
-                attr_str += f" aria-label='{attrs['aria-label'][:30]}'"
-            
-            summary_lines.append(f"  [{index}] <{tag}>{attr_str} {text}")
-        
-        if len(dom_elements) > max_elements:
-            summary_lines.append(f"  ... and {len(dom_elements) - max_elements} more elements")
-        
-        return "\n".join(summary_lines)
-    
-    def _parse_response(self, content: str) -> dict:
-        """Parse LLM response to extract JSON action."""
-        # Try to find JSON in the response
-        content = content.strip()
-        
-        # If response is wrapped in markdown code blocks
-        if content.startswith("```"):
-            # Extract content between code blocks
-            lines = content.split("\n")
-            json_lines = []
-            in_code = False
-            for line in lines:
-                if line.startswith("```"):
-                    in_code = not in_code
-                elif in_code:
-                    json_lines.append(line)
-            content = "\n".join(json_lines)
-        
-        # Parse JSON
-        return json.loads(content)
+    def _format_ux_feedback(self, ux_feedback: Optional[UXFeedback], current_url: str) -> str:
+        """Format UX feedback for the prompt."""
+        if ux_feedback is None:
+            return "None yet (the current page is still being analyzed)"
+        
+        lines = []
+        if ux_feedback.url != current_url:
+            lines.append(f"(From the previous page: {ux_feedback.url})")
+        lines.append(f"Recommendation: {ux_feedback.recommendation}")
+        lines.append(f"Confidence: {ux_feedback.confidence}")
+        lines.append(f"Priority: {ux_feedback.priority}")
+        lines.append(f"Issues: {', '.join(ux_feedback.issues) if ux_feedback.issues else 'None'}")
+        lines.append(f"Positive aspects: {', '.join(ux_feedback.positive_aspects) if ux_feedback.positive_aspects else 'None'}")
+        return "\n".join(lines)
     
     def get_history_summary(self) -> dict:
         """Get summary of navigation history."""
         return {
-            "total_steps": len(self.history),
-            "actions_taken": [entry['action']['type'] for entry in self.history],
-            "urls_visited": list(set(entry['url'] for entry in self.history)),
+            "total_steps": self.total_steps,
+            "actions_taken": [entry['action']['type'] for entry in self.history],  # most recent HISTORY_LIMIT
+            "urls_visited": list(self._urls_visited),
         }
+    
+    def reset(self):
+        """Clear navigation history."""
+        self.history.clear()
+        self.total_steps = 0
+        self._urls_visited.clear()
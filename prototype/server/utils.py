@@ -0,0 +1,143 @@
+"""Helpers shared by the server-side agents."""
+
+import logging
+from itertools import islice
+from typing import Callable
+
+from pydantic import TypeAdapter
+
+from prototype.shared.models import BrowserState, DomElements, ModelT
+
+logger = logging.getLogger(__name__)
+
+# Largest number of elements any agent puts in its prompt
+MAX_SUMMARY_ELEMENTS = 30
+
+# Agent histories only feed the last few entries into prompts; cap them so long
+# sessions stay bounded (running totals are counted separately)
+HISTORY_LIMIT = 256
+
+
+def summarize_dom(dom_elements: DomElements, max_elements: int) -> list[str]:
+    """
+    Format the first `max_elements` DOM elements as prompt lines.
+    
+    Args:
+        dom_elements: Elements as sent by the client
+        max_elements: Maximum number of elements to format
+    
+    Returns:
+        One line per element
+    """
+    lines = []
+    append = lines.append
+    get = dict.get
+    rows = islice(
+        zip(dom_elements.index, dom_elements.tag, dom_elements.text, dom_elements.attributes),
+        max_elements,
+    )
+    for index, tag, text, attrs in rows:
+        # Include relevant attributes
+        placeholder = get(attrs, 'placeholder')
+        aria_label = get(attrs, 'aria-label')
+        attr_str = ""
+        if placeholder:
+            attr_str = f" placeholder='{placeholder[:30]}'"
+        if aria_label:
+            attr_str += f" aria-label='{aria_label[:30]}'"
+        
+        append(f"  [{index}] <{tag}>{attr_str} {text[:60]}")
+    
+    return lines
+
+
+def state_dom_summary(state: BrowserState, max_elements: int) -> str:
+    """
+    Summarize the DOM elements of a browser state for a prompt.
+    
+    The formatted lines are computed once per state and cached on it, so the
+    Navigation Agent and UX Specialist don't both walk the DOM for one request.
+    
+    Args:
+        state: Current browser state
+        max_elements: Maximum number of elements to include
+    
+    Returns:
+        The summary text
+    """
+    dom_elements = state.dom_elements
+    if not dom_elements:
+        return "No interactive elements found."
+    
+    if max_elements > MAX_SUMMARY_ELEMENTS:
+        lines = summarize_dom(dom_elements, max_elements)
+    else:
+        if state._dom_lines is None:
+            state._dom_lines = summarize_dom(dom_elements, MAX_SUMMARY_ELEMENTS)
+        lines = state._dom_lines[:max_elements]
+    
+    if len(dom_elements) > max_elements:
+        lines = lines + [f"  ... and {len(dom_elements) - max_elements} more elements"]
+    
+    return "\n".join(lines)
+
+
+def strip_code_fence(content: str) -> str:
+    """
+    Return the payload of a markdown code block, or `content` if it isn't one.
+    
+    Args:
+        content: Stripped LLM response, e.g. "```json\n{...}\n```"
+    
+    Returns:
+        The text between the opening fence line and the closing fence
+    """
+    if not content.startswith("```"):
+        return content
+    
+    # Drop the opening fence line (which may carry a language tag), then cut at the closing fence
+    _, _, rest = content.partition("\n")
+    body, _, _ = rest.partition("```")
+    return body
+
+
+def parse_llm_json(
+    content: str,
+    adapter: TypeAdapter[ModelT],
+    fallback: Callable[[Exception], ModelT]
+) -> ModelT:
+    """
+    Validate an LLM response straight from its JSON text.
+    
+    Args:
+        content: Raw LLM response, optionally wrapped in a markdown code block
+        adapter: Cached TypeAdapter of the expected model
+        fallback: Builds the value to return from the parse error
+    
+    Returns:
+        The validated model, or the fallback if the response isn't valid
+    """
+    try:
+        # Parse and validate JSON in one pass, without an intermediate dict
+        return adapter.validate_json(strip_code_fence(content.strip()))
+    except ValueError as e:
+        logger.warning("Warning: Failed to parse LLM response: %s\nResponse: %.500s", e, content)
+        return fallback(e)
+
+
+def build_messages(system_prompt: str, prompt: str) -> list:
+    """
+    Build the [system, user] message list for one LLM call.
+    
+    The message classes are imported here rather than at module level, so
+    importing the server doesn't load browser_use.
+    
+    Args:
+        system_prompt: The agent's system prompt
+        prompt: The prompt for this call
+    
+    Returns:
+        Messages to pass to llm.ainvoke()
+    """
+    from browser_use.llm.messages import SystemMessage, UserMessage
+    return [SystemMessage(content=system_prompt), UserMessage(content=prompt)]
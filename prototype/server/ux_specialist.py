@@ -1,12 +1,34 @@
 """UX Specialist Agent - Analyzes pages and provides feedback."""
 
-import json
+from collections import deque
 from datetime import datetime
+from itertools import islice
 from typing import Optional
 
-from browser_use.llm.messages import SystemMessage, UserMessage
+from pydantic import BaseModel, Field, TypeAdapter
 
-from shared.models import BrowserState, UXFeedback
+from prototype.shared.models import BrowserState, Priority, UXFeedback
+from prototype.server.utils import HISTORY_LIMIT, build_messages, parse_llm_json, state_dom_summary
+
+
+class _UXPayload(BaseModel):
+    """The part of UXFeedback the LLM fills in."""
+    
+    issues: list[str] = Field(default_factory=list)
+    positive_aspects: list[str] = Field(default_factory=list)
+    recommendation: str = "No recommendation"
+    confidence: float = Field(default=0.5, ge=0.0, le=1.0)
+    priority: Priority = "medium"
+
+
+_UX_PAYLOAD_ADAPTER = TypeAdapter(_UXPayload)
+
+# Used when the LLM response can't be parsed
+_FALLBACK_PAYLOAD = _UXPayload(
+    issues=["Failed to analyze page"],
+    recommendation="Continue with caution",
+    confidence=0.3,
+)
 
 
 class UXSpecialist:
@@ -20,7 +42,11 @@ class UXSpecialist:
             llm: Language model instance (e.g., ChatBrowserUse, ChatOpenAI)
         """
         self.llm = llm
-        self.feedback_history: list[UXFeedback] = []
+        self.feedback_history: deque[UXFeedback] = deque(maxlen=HISTORY_LIMIT)
+        
+        # Running totals; feedback_history only keeps the most recent entries
+        self.total_analyzed = 0
+        self._confidence_sum = 0.0
         
         self.system_prompt = """You are a UX Specialist AI agent. Your role is to:
 
@@ -66,39 +92,26 @@ Return your analysis in JSON format:
         prompt = self._build_analysis_prompt(state, task, step_number)
         
         # Get LLM analysis with proper message format
-        messages = [
-            SystemMessage(content=self.system_prompt),
-            UserMessage(content=prompt)
-        ]
-        
-        response = await self.llm.ainvoke(messages)
+        response = await self.llm.ainvoke(build_messages(self.system_prompt, prompt))
         
         # Parse response
-        try:
-            analysis = self._parse_response(response.completion)
-        except Exception as e:
-            print(f"Warning: Failed to parse UX analysis: {e}")
-            analysis = {
-                "issues": ["Failed to analyze page"],
-                "positive_aspects": [],
-                "recommendation": "Continue with caution",
-                "confidence": 0.3,
-                "priority": "medium"
-            }
+        analysis = parse_llm_json(response.completion, _UX_PAYLOAD_ADAPTER, lambda e: _FALLBACK_PAYLOAD)
         
         # Create feedback object
         feedback = UXFeedback(
             url=state.url,
             timestamp=datetime.now().isoformat(),
-            issues=analysis.get("issues", []),
-            positive_aspects=analysis.get("positive_aspects", []),
-            recommendation=analysis.get("recommendation", "No recommendation"),
-            confidence=analysis.get("confidence", 0.5),
-            priority=analysis.get("priority", "medium")
+            issues=analysis.issues,
+            positive_aspects=analysis.positive_aspects,
+            recommendation=analysis.recommendation,
+            confidence=analysis.confidence,
+            priority=analysis.priority
         )
         
         # Store in history
         self.feedback_history.append(feedback)
+        self.total_analyzed += 1
+        self._confidence_sum += feedback.confidence
         
         return feedback
     
@@ -111,12 +124,12 @@ Return your analysis in JSON format:
         """Build the analysis prompt for the LLM."""
         
         # Summarize DOM elements
-        dom_summary = self._summarize_dom(state.dom_elements)
+        dom_summary = state_dom_summary(state, max_elements=20)
         
         # Get recent history context
         history_context = ""
         if len(self.feedback_history) > 0:
-            recent = self.feedback_history[-3:]  # Last 3 pages
+            recent = islice(self.feedback_history, max(0, len(self.feedback_history) - 3), None)  # Last 3 pages
             history_context = "\n\nRecent page history:\n"
             for i, feedback in enumerate(recent, 1):
                 history_context += f"{i}. {feedback.url} - {feedback.recommendation}\n"
@@ -151,49 +164,16 @@ Return ONLY valid JSON matching this format:
         
         return prompt
     
-    def _summarize_dom(self, dom_elements: list[dict], max_elements: int = 20) -> str:
-        """Summarize DOM elements for the prompt."""
-        if not dom_elements:
-            return "No interactive elements found."
-        
-        summary_lines = []
-        for i, elem in enumerate(dom_elements[:max_elements]):
-            text = elem.get('text', '')[:50]
-            tag = elem.get('tag', 'unknown')
-            index = elem.get('index', i)
-            
-            summary_lines.append(f"  [{index}] <{tag}> {text}")
-        
-        if len(dom_elements) > max_elements:
-            summary_lines.append(f"  ... and {len(dom_elements) - max_elements} more elements")
-        
-        return "\n".join(summary_lines)
-    
-    def _parse_response(self, content: str) -> dict:
-        """Parse LLM response to extract JSON."""
-        # Try to find JSON in the response
-        content = content.strip()
-        
-        # If response is wrapped in markdown code blocks
-        if content.startswith("```"):
-            # Extract content between code blocks
-            lines = content.split("\n")
-            json_lines = []
-            in_code = False
-            for line in lines:
-                if line.startswith("```"):
-                    in_code = not in_code
-                elif in_code:
-                    json_lines.append(line)
-            content = "\n".join(json_lines)
-        
-        # Parse JSON
-        return json.loads(content)
-    
     def get_feedback_summary(self) -> dict:
         """Get summary of all feedback collected."""
         return {
-            "total_pages_analyzed": len(self.feedback_history),
-            "average_confidence": sum(f.confidence for f in self.feedback_history) / len(self.feedback_history) if self.feedback_history else 0,
-            "urls_visited": [f.url for f in self.feedback_history],
+            "total_pages_analyzed": self.total_analyzed,
+            "average_confidence": self._confidence_sum / self.total_analyzed if self.total_analyzed else 0,
+            "urls_visited": [f.url for f in self.feedback_history],  # most recent HISTORY_LIMIT
         }
+    
+    def reset(self):
+        """Clear feedback history."""
+        self.feedback_history.clear()
+        self.total_analyzed = 0
+        self._confidence_sum = 0.0
@@ -1,24 +1,120 @@
 """Shared data models between client and server."""
 
-from typing import Any, Literal, Optional
-from pydantic import BaseModel, Field
+from typing import Literal, Optional, TypeVar, Union
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, TypeAdapter, model_serializer, model_validator
+
+# Optional MessagePack transport (pip install msgspec); JSON is used without it
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+MSGPACK_MEDIA_TYPE = "application/vnd.msgpack"
+MSGPACK_AVAILABLE = msgspec is not None
+
+if MSGPACK_AVAILABLE:
+    _MSGPACK_ENCODER = msgspec.msgpack.Encoder()
+    _MSGPACK_DECODER = msgspec.msgpack.Decoder()
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+ActionType = Literal["click", "input", "navigate", "scroll", "wait", "done", "extract"]
+Priority = Literal["low", "medium", "high"]
+
+# Wire models are validated once and then only read. Unknown keys are dropped,
+# and frozen instances can't be changed in place (use model_copy(update=...)).
+_WIRE_CONFIG = ConfigDict(extra="ignore", frozen=True)
+
+
+class DomElements(BaseModel):
+    """
+    Interactive elements of a page, stored column-wise.
+    
+    Row i of every list describes one element. Field names go over the wire once
+    instead of once per element, and decoding builds a few flat lists rather
+    than a dict per element.
+    """
+    
+    model_config = _WIRE_CONFIG
+    
+    index: list[int] = Field(default_factory=list)
+    tag: list[str] = Field(default_factory=list)
+    text: list[str] = Field(default_factory=list)
+    attributes: list[dict[str, str]] = Field(default_factory=list)
+    
+    @model_validator(mode="after")
+    def _check_columns(self):
+        n = len(self.index)
+        if not (len(self.tag) == len(self.text) == len(self.attributes) == n):
+            raise ValueError("DOM element columns must all have the same length")
+        return self
+    
+    def __len__(self) -> int:
+        return len(self.index)
+
+
+class Viewport(BaseModel):
+    """
+    Browser viewport size and scroll offset.
+    
+    Goes over the wire as a `[width, height, scroll_x, scroll_y]` array, so the
+    field names are never sent. The object form is still accepted on input.
+    """
+    
+    model_config = _WIRE_CONFIG
+    
+    width: int
+    height: int
+    scroll_x: int = 0
+    scroll_y: int = 0
+    
+    @model_validator(mode="before")
+    @classmethod
+    def _from_array(cls, data):
+        if isinstance(data, (list, tuple)):
+            return dict(zip(("width", "height", "scroll_x", "scroll_y"), data))
+        return data
+    
+    @model_serializer
+    def _to_array(self) -> list[int]:
+        return [self.width, self.height, self.scroll_x, self.scroll_y]
+    
+    def to_dict(self) -> dict[str, int]:
+        """The viewport as a plain dict, for code that expects the old field type."""
+        return {
+            "width": self.width,
+            "height": self.height,
+            "scroll_x": self.scroll_x,
+            "scroll_y": self.scroll_y,
+        }
 
 
 class BrowserState(BaseModel):
     """Current state of the browser."""
     
+    model_config = _WIRE_CONFIG
+    
     url: str
     title: str
-    html: str
-    screenshot: str  # base64 encoded
-    dom_elements: list[dict[str, Any]]
-    viewport: dict[str, int]
+    html: str = ""  # full page HTML; the local client leaves it out and sends dom_elements instead
+    screenshot_ref: Optional[str] = None  # content hash of the screenshot sent alongside, if any
+    dom_elements: DomElements = Field(default_factory=DomElements)
+    viewport: Viewport
+    
+    # Raw WebP screenshot (at most 768x768). Sent as its own binary multipart part
+    # rather than base64 inside the JSON, so it is never serialized with the model.
+    _screenshot: Optional[bytes] = PrivateAttr(default=None)
+    
+    # Server-side cache of formatted DOM summary lines (see server.utils.state_dom_summary)
+    _dom_lines: Optional[list[str]] = PrivateAttr(default=None)
 
 
 class Action(BaseModel):
     """Action to be executed by the browser."""
     
-    type: Literal["click", "input", "navigate", "scroll", "wait", "done", "extract"]
+    model_config = _WIRE_CONFIG
+    
+    type: ActionType
     index: Optional[int] = None
     text: Optional[str] = None
     url: Optional[str] = None
@@ -32,18 +128,22 @@ class Action(BaseModel):
 class UXFeedback(BaseModel):
     """UX analysis feedback."""
     
+    model_config = _WIRE_CONFIG
+    
     url: str
     timestamp: str
     issues: list[str] = Field(default_factory=list)
     positive_aspects: list[str] = Field(default_factory=list)
     recommendation: str
     confidence: float = Field(ge=0.0, le=1.0)
-    priority: Literal["low", "medium", "high"] = "medium"
+    priority: Priority = "medium"
 
 
 class NavigationRequest(BaseModel):
     """Request sent from client to server."""
     
+    model_config = _WIRE_CONFIG
+    
     task: str
     state: BrowserState
     step_number: int = 0
@@ -52,6 +152,108 @@ class NavigationRequest(BaseModel):
 class NavigationResponse(BaseModel):
     """Response from server to client."""
     
+    model_config = _WIRE_CONFIG
+    
     action: Action
-    ux_feedback: UXFeedback
+    ux_feedback: Optional[UXFeedback] = None  # the server publishes UX feedback on GET /ux instead
+    message: Optional[str] = None
+
+
+class BatchNavigationRequest(BaseModel):
+    """Several navigation requests sent in one round trip, handled in order."""
+    
+    model_config = _WIRE_CONFIG
+    
+    items: list[NavigationRequest]
+
+
+class BatchNavigationResponse(BaseModel):
+    """Responses to a BatchNavigationRequest, aligned with its items."""
+    
+    model_config = _WIRE_CONFIG
+    
+    items: list[NavigationResponse]
+
+
+# Built once at import; the route handlers (de)serialize through these
+NAV_REQ_ADAPTER = TypeAdapter(NavigationRequest)
+NAV_RES_ADAPTER = TypeAdapter(NavigationResponse)
+BATCH_REQ_ADAPTER = TypeAdapter(BatchNavigationRequest)
+BATCH_RES_ADAPTER = TypeAdapter(BatchNavigationResponse)
+# Lists of UX feedback: GET /ux batches, GET /feedback, legacy feedback files
+UX_FEEDBACK_LIST_ADAPTER = TypeAdapter(list[UXFeedback])
+
+# A minimal but complete request, touching every nested model and column
+_WARM_UP_REQUEST = (
+    b'{"task":"","state":{"url":"","title":"","viewport":[0,0,0,0],'
+    b'"dom_elements":{"index":[0],"tag":["a"],"text":[""],"attributes":[{"role":"link"}]}}}'
+)
+
+
+def _warm_up():
+    """
+    Push one sample through each adapter.
+    
+    The schemas are already built when the classes and adapters are created, but
+    the first validation/serialization of a process still ran ~10x slower than
+    later ones; doing it here keeps that off the first request.
+    """
+    NAV_REQ_ADAPTER.validate_json(_WARM_UP_REQUEST)
+    BATCH_REQ_ADAPTER.validate_json(b'{"items":[' + _WARM_UP_REQUEST + b']}')
+    response = NavigationResponse(
+        action=Action(type="wait"),
+        ux_feedback=UXFeedback(url="", timestamp="", recommendation="", confidence=0.0),
+    )
+    NAV_RES_ADAPTER.dump_json(response)
+    BATCH_RES_ADAPTER.dump_json(BatchNavigationResponse(items=[response]))
+
+
+_warm_up()
+
+
+def decode_request(body: Union[bytes, str]) -> NavigationRequest:
+    """Validate a NavigationRequest straight from JSON."""
+    return NAV_REQ_ADAPTER.validate_json(body)
+
+
+def encode_response(response: NavigationResponse) -> bytes:
+    """Serialize a NavigationResponse to JSON bytes."""
+    return NAV_RES_ADAPTER.dump_json(response)
+
+
+def decode_batch_request(body: Union[bytes, str]) -> BatchNavigationRequest:
+    """Validate a BatchNavigationRequest straight from JSON."""
+    return BATCH_REQ_ADAPTER.validate_json(body)
+
+
+def encode_batch_response(response: BatchNavigationResponse) -> bytes:
+    """Serialize a BatchNavigationResponse to JSON bytes."""
+    return BATCH_RES_ADAPTER.dump_json(response)
+
+
+def build_response(
+    action: Action,
+    ux_feedback: Optional[UXFeedback] = None,
     message: Optional[str] = None
+) -> NavigationResponse:
+    """
+    Build a NavigationResponse from parts the server already validated.
+    
+    Uses model_construct, so nothing is revalidated. Only pass trusted,
+    server-produced models here; client input goes through normal validation.
+    """
+    return NavigationResponse.model_construct(
+        action=action,
+        ux_feedback=ux_feedback,
+        message=message
+    )
+
+
+def to_msgpack(model: BaseModel) -> bytes:
+    """Encode a model as MessagePack. Requires msgspec (see MSGPACK_AVAILABLE)."""
+    return _MSGPACK_ENCODER.encode(model.model_dump())
+
+
+def from_msgpack(model_cls: type[ModelT], data: bytes) -> ModelT:
+    """Decode and validate a model from MessagePack. Requires msgspec (see MSGPACK_AVAILABLE)."""
+    return model_cls.model_validate(_MSGPACK_DECODER.decode(data))
@@ -16,7 +16,7 @@ fi
 
 # Check if dependencies are installed
 echo "📦 Checking dependencies..."
-python -c "import fastapi, uvicorn, httpx, langchain_core" 2>/dev/null || {
+python -c "import fastapi, uvicorn, httpx, orjson, python_multipart, PIL, browser_use" 2>/dev/null || {
     echo "❌ Dependencies not installed. Installing..."
     uv pip install -r requirements.txt
 }
@@ -35,14 +35,14 @@ case $choice in
     1)
         echo ""
         echo "🌐 Starting server on http://localhost:8000"
-        cd server && python main.py
+        cd .. && python -m prototype.server.main
         ;;
     2)
         read -p "Enter URL: " url
         read -p "Enter task: " task
         echo ""
         echo "🌐 Starting client..."
-        cd local && python run.py --url "$url" --task "$task"
+        cd .. && python -m prototype.local.run --url "$url" --task "$task"
         ;;
     3)
         echo ""
@@ -51,8 +51,8 @@ case $choice in
         echo "Terminal 2: Client"
         echo ""
         echo "Run these commands:"
-        echo "  Terminal 1: cd server && python main.py"
-        echo "  Terminal 2: cd local && python run.py --url YOUR_URL --task 'YOUR_TASK'"
+        echo "  Terminal 1: cd .. && python -m prototype.server.main"
+        echo "  Terminal 2: cd .. && python -m prototype.local.run --url YOUR_URL --task 'YOUR_TASK'"
         ;;
     *)
         echo "Invalid choice"
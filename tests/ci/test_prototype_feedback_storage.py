@@ -0,0 +1,62 @@
+"""Tests for the prototype server's JSON Lines feedback storage."""
+
+import json
+
+from prototype.server.feedback_storage import FeedbackStorage
+from prototype.shared.models import UXFeedback
+
+
+def _feedback(url: str, confidence: float = 0.5, priority: str = 'medium') -> UXFeedback:
+	return UXFeedback(
+		url=url,
+		timestamp='2024-01-01T00:00:00',
+		issues=[f'Issue on {url}'],
+		recommendation=f'Fix {url}',
+		confidence=confidence,
+		priority=priority,
+	)
+
+
+def test_jsonl_round_trip(tmp_path):
+	"""Each stored entry is appended as one JSON line and loads back unchanged."""
+	path = tmp_path / 'feedback.jsonl'
+	entries = [_feedback('https://a.example', 0.9, 'high'), _feedback('https://b.example')]
+
+	storage = FeedbackStorage(storage_path=path)
+	for entry in entries:
+		storage.store(entry)
+
+	lines = path.read_text().splitlines()
+	assert len(lines) == 2
+	assert [UXFeedback.model_validate_json(line) for line in lines] == entries
+
+	reloaded = FeedbackStorage(storage_path=path)
+	assert reloaded.get_all() == entries
+	assert reloaded.get_summary() == storage.get_summary()
+
+
+def test_legacy_json_array_is_migrated(tmp_path):
+	"""A file holding a single JSON array is loaded and rewritten as JSON Lines."""
+	path = tmp_path / 'feedback.json'
+	entries = [_feedback('https://a.example'), _feedback('https://b.example', 0.95, 'low')]
+	path.write_text(json.dumps([entry.model_dump() for entry in entries], indent=2))
+
+	storage = FeedbackStorage(storage_path=path)
+	assert storage.get_all() == entries
+	assert storage.get_summary()['priority_distribution'] == {'high': 0, 'medium': 1, 'low': 1}
+
+	# Rewritten in place; later stores append to it as usual
+	assert [UXFeedback.model_validate_json(line) for line in path.read_text().splitlines()] == entries
+	storage.store(_feedback('https://c.example'))
+	assert FeedbackStorage(storage_path=path).get_all() == [*entries, _feedback('https://c.example')]
+
+
+def test_clear_removes_file(tmp_path):
+	path = tmp_path / 'feedback.jsonl'
+	storage = FeedbackStorage(storage_path=path)
+	storage.store(_feedback('https://a.example'))
+
+	storage.clear()
+
+	assert not path.exists()
+	assert storage.get_summary()['total_feedback'] == 0
@@ -0,0 +1,68 @@
+"""Tests for the prototype's shared client/server models."""
+
+import pytest
+from pydantic import ValidationError
+
+from prototype.shared.models import Action, DomElements, NavigationResponse, UXFeedback, Viewport, build_response
+
+
+def test_build_response_matches_validated_response():
+	"""build_response skips validation but must produce the same response as the validating constructor."""
+	action = Action(type='click', index=3, reasoning='Open the search form')
+	ux_feedback = UXFeedback(
+		url='https://example.com',
+		timestamp='2024-01-01T00:00:00',
+		issues=['Search button is low contrast'],
+		recommendation='Click the search button',
+		confidence=0.8,
+		priority='high',
+	)
+
+	response = build_response(action=action, ux_feedback=ux_feedback, message='Step 1 completed')
+	expected = NavigationResponse(action=action, ux_feedback=ux_feedback, message='Step 1 completed')
+
+	assert response.action is action
+	assert response.ux_feedback is ux_feedback
+	assert response.message == 'Step 1 completed'
+	assert response.model_dump_json() == expected.model_dump_json()
+	assert NavigationResponse.model_validate_json(response.model_dump_json()) == expected
+
+
+def test_dom_elements_columns_round_trip():
+	"""DomElements goes over the wire as parallel lists and comes back unchanged."""
+	dom_elements = DomElements(
+		index=[0, 1],
+		tag=['a', 'button'],
+		text=['Home', 'Search'],
+		attributes=[{'href': '/'}, {'type': 'submit', 'aria-label': 'Search'}],
+	)
+
+	data = dom_elements.model_dump_json()
+
+	assert data == (
+		'{"index":[0,1],"tag":["a","button"],"text":["Home","Search"],'
+		'"attributes":[{"href":"/"},{"type":"submit","aria-label":"Search"}]}'
+	)
+	assert DomElements.model_validate_json(data) == dom_elements
+	assert len(dom_elements) == 2
+
+
+def test_dom_elements_rejects_ragged_columns():
+	with pytest.raises(ValidationError, match='same length'):
+		DomElements.model_validate_json('{"index":[0,1],"tag":["a"],"text":["x","y"],"attributes":[{},{}]}')
+
+
+def test_viewport_round_trips_as_array():
+	"""Viewport is sent as [width, height, scroll_x, scroll_y] and still accepts the object form."""
+	viewport = Viewport(width=1280, height=720, scroll_y=1500)
+
+	assert viewport.model_dump_json() == '[1280,720,0,1500]'
+	assert Viewport.model_validate_json('[1280,720,0,1500]') == viewport
+	assert Viewport.model_validate_json('[1280,720]') == Viewport(width=1280, height=720)
+	assert Viewport.model_validate({'width': 1280, 'height': 720, 'scroll_y': 1500}) == viewport
+	assert viewport.to_dict() == {'width': 1280, 'height': 720, 'scroll_x': 0, 'scroll_y': 1500}
+
+
+def test_viewport_requires_width_and_height():
+	with pytest.raises(ValidationError):
+		Viewport.model_validate_json('[1280]')
@@ -0,0 +1,130 @@
+"""Tests for the prototype server's navigate endpoints and their wire encodings."""
+
+import re
+
+import pytest
+from fastapi.testclient import TestClient
+
+from browser_use.llm.views import ChatInvokeCompletion
+from prototype.server import main
+from prototype.shared.models import (
+	MSGPACK_AVAILABLE,
+	MSGPACK_MEDIA_TYPE,
+	Action,
+	BatchNavigationResponse,
+	NavigationRequest,
+	NavigationResponse,
+	from_msgpack,
+	to_msgpack,
+)
+
+requires_msgspec = pytest.mark.skipif(not MSGPACK_AVAILABLE, reason='msgspec is not installed')
+
+
+class _StubLLM:
+	"""Answers every prompt by clicking the element whose index is the prompt's step number.
+
+	The UX Specialist ignores the unknown keys and falls back to its defaults, so one
+	answer serves both agents.
+	"""
+
+	def __init__(self, temperature: float):
+		self.temperature = temperature
+
+	async def ainvoke(self, messages):
+		step = re.search(r'^STEP: (\d+)$', messages[-1].content, re.MULTILINE).group(1)
+		return ChatInvokeCompletion(completion=f'{{"type": "click", "index": {step}}}', usage=None)
+
+
+@pytest.fixture
+def client(monkeypatch):
+	monkeypatch.setattr(main, 'LLM_CLASS', _StubLLM)
+	with TestClient(main.app) as client:
+		yield client
+
+
+def _request(step_number: int) -> dict:
+	return {
+		'task': 'Find the pricing page',
+		'step_number': step_number,
+		'state': {'url': 'https://example.com', 'title': 'Example', 'viewport': [1280, 720]},
+	}
+
+
+def test_navigate_json_round_trip(client):
+	response = client.post('/navigate', json=_request(3))
+
+	assert response.status_code == 200
+	assert response.headers['content-type'] == 'application/json'
+	body = NavigationResponse.model_validate_json(response.content)
+	assert body.action == Action(type='click', index=3)
+	assert body.message == 'Step 3 completed'
+
+
+@requires_msgspec
+def test_navigate_msgpack_round_trip(client):
+	request = NavigationRequest.model_validate(_request(4))
+
+	response = client.post(
+		'/navigate',
+		content=to_msgpack(request),
+		headers={'Content-Type': MSGPACK_MEDIA_TYPE, 'Accept': MSGPACK_MEDIA_TYPE},
+	)
+
+	assert response.status_code == 200
+	assert response.headers['content-type'] == MSGPACK_MEDIA_TYPE
+	body = from_msgpack(NavigationResponse, response.content)
+	assert body.action == Action(type='click', index=4)
+	assert body.message == 'Step 4 completed'
+
+
+@requires_msgspec
+def test_accept_header_selects_response_encoding(client):
+	"""The response encoding follows `Accept`, independently of the request body's encoding."""
+	json_in_msgpack_out = client.post('/navigate', json=_request(1), headers={'Accept': MSGPACK_MEDIA_TYPE})
+	assert json_in_msgpack_out.headers['content-type'] == MSGPACK_MEDIA_TYPE
+	assert from_msgpack(NavigationResponse, json_in_msgpack_out.content).action.index == 1
+
+	msgpack_in_json_out = client.post(
+		'/navigate',
+		content=to_msgpack(NavigationRequest.model_validate(_request(2))),
+		headers={'Content-Type': MSGPACK_MEDIA_TYPE},
+	)
+	assert msgpack_in_json_out.headers['content-type'] == 'application/json'
+	assert NavigationResponse.model_validate_json(msgpack_in_json_out.content).action.index == 2
+
+
+def test_batch_results_follow_item_order(client):
+	steps = [5, 1, 3]
+
+	response = client.post('/navigate/batch', json={'items': [_request(step) for step in steps]})
+
+	assert response.status_code == 200
+	items = BatchNavigationResponse.model_validate_json(response.content).items
+	assert [item.action.index for item in items] == steps
+	assert [item.message for item in items] == [f'Step {step} completed' for step in steps]
+
+
+def test_invalid_body_returns_422(client):
+	response = client.post('/navigate', json={'task': 1})
+	assert response.status_code == 422
+	assert {tuple(error['loc']) for error in response.json()['detail']} == {('body', 'task'), ('body', 'state')}
+
+	batch = client.post('/navigate/batch', json={'items': [_request(1), {**_request(2), 'task': 1}]})
+	assert batch.status_code == 422
+	assert [error['loc'] for error in batch.json()['detail']] == [['body', 'items', 1, 'task']]
+
+
+@requires_msgspec
+def test_malformed_msgpack_returns_400(client):
+	response = client.post('/navigate', content=b'\xc1', headers={'Content-Type': MSGPACK_MEDIA_TYPE})
+
+	assert response.status_code == 400
+
+
+def test_msgpack_without_msgspec_returns_415(client, monkeypatch):
+	monkeypatch.setattr(main, 'MSGPACK_AVAILABLE', False)
+
+	response = client.post('/navigate', content=b'\x80', headers={'Content-Type': MSGPACK_MEDIA_TYPE})
+
+	assert response.status_code == 415